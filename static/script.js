@@ -261,7 +261,7 @@ async function analyzeScript() {
   try {
     const response = await fetch("/analyze", {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
       body: JSON.stringify({ script }),
     });
 
@@ -270,7 +270,7 @@ async function analyzeScript() {
       throw new Error(errorData.error || "Analysis failed");
     }
 
-    const data = await response.json();
+    const data = await readAnalysisStream(response);
 
     // If we have voice analysis, combine with text analysis
     if (voiceAnalysisResult) {
@@ -335,6 +335,72 @@ async function analyzeScript() {
   }
 }
 
+// Reads the /analyze event stream: "partial" events carry scores as soon as
+// the AI has produced them, the "result" event carries the full analysis.
+async function readAnalysisStream(response) {
+  if (!response.headers.get("Content-Type")?.startsWith("text/event-stream")) {
+    return response.json();
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  const partialScores = {};
+  let buffer = "";
+  let result = null;
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = "message";
+      let payload = "";
+      for (const line of rawEvent.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) payload += line.slice(5).trim();
+      }
+      const eventData = payload ? JSON.parse(payload) : {};
+
+      if (event === "partial") {
+        Object.assign(partialScores, eventData);
+        showPartialScores(partialScores);
+      } else if (event === "result") {
+        result = eventData;
+      } else if (event === "error") {
+        throw new Error(eventData.error || "Analysis failed");
+      }
+    }
+  }
+
+  if (!result) throw new Error("Analysis failed");
+  return result;
+}
+
+function showPartialScores(scores) {
+  // Only touch the scores that have arrived; the rest keep their current bars
+  const fields = [
+    ["nervousness_score", nervousnessProgress, nervousnessValue],
+    ["confidence_score", confidenceProgress, confidenceValue],
+    ["clarity_score", clarityProgress, clarityValue],
+  ];
+  for (const [field, progress, value] of fields) {
+    if (!(field in scores)) continue;
+    animateProgressBar(progress, scores[field]);
+    if (value) value.textContent = scores[field];
+  }
+  if (resultsSection && resultsSection.classList.contains("hidden")) {
+    if (issuesList) issuesList.innerHTML = "<li>Analyzing...</li>";
+    if (improvedScript) improvedScript.textContent = "Generating improved script...";
+    if (tipsList) tipsList.innerHTML = "";
+    resultsSection.classList.remove("hidden");
+  }
+}
+
 function updateTimestamp() {
   if (!timestampEl) return;
 